@@ -9,3 +9,13 @@ CONFIG_FILE_NAME = 'config.pickle'
 CONFIG_FILE_PATH = Path('/usr/src/app') / Path(CONFIG_FILE_NAME)
 RANGE_HEADER = 'Range'
 RANGE_HEADER_TEMPLATE = 'bytes={}-{}'
+LARGEST = 'largest'
+SMALLEST = 'smallest'
+DEFAULT_MAX_GROUPS = 10000
+STDIN_SOURCE = '-'
+FILE_URL_SCHEME = 'file'
+LOCAL_HOSTS = ('', 'localhost')
+GZIP_MAGIC = b'\x1f\x8b'
+BZIP2_MAGIC = b'BZh'
+XZ_MAGIC = b'\xfd7zXZ\x00'
+MAGIC_LENGTH = 6
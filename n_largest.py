@@ -1,18 +1,19 @@
 import click
 import pickle
 import gzip
-from constants import CACHE_PATH, CONFIG_FILE_PATH
-from param_types import LocalPath, RemoteUrl
+from constants import CACHE_PATH, CONFIG_FILE_PATH, DEFAULT_MAX_GROUPS
+from param_types import LocalPath, InputSource, Regex, Delimiter
 from pathlib import Path
 from os import remove
-from util import get_remote_file, get_n_largest, print_n_largest, remake_config_file_if_missing
+from util import get_remote_file, remake_config_file_if_missing, print_extremes, make_group_key, is_remote_url, \
+    open_local_source
 
 
 @click.group()
 def n_largest_cli():
     """
-    CLI for getting id, number pairs from a remote text file and printing the ids of the largest N numbers to stdout.
-    Additionally includes cache configuration utilities to improve performance.
+    CLI for getting id, number pairs from a remote or local text file and printing the ids of the largest N numbers to
+    stdout. Additionally includes cache configuration utilities to improve performance.
     """
     pass
 
@@ -27,13 +28,31 @@ def n_largest_cli():
                                          ' should use larger chunk sizes to improve performance. Minimum chunk size '
                                          'is 1024 bytes (Default: 256kb -> 256000 bytes)',
               type=click.IntRange(min=1024), default=256000)
-@click.argument('url', type=RemoteUrl(), required=True)
+@click.option('-l', '--largest', help='Additionally report the ids of the LARGEST largest numbers. May be given'
+                                      ' multiple times, all are computed in the same pass over the file.',
+              type=click.IntRange(min=1), multiple=True)
+@click.option('-s', '--smallest', help='Additionally report the ids of the SMALLEST smallest numbers. May be given'
+                                       ' multiple times, all are computed in the same pass over the file.',
+              type=click.IntRange(min=1), multiple=True)
+@click.option('-g', '--group-by', help='Regular expression applied to each id to select its group. The first capture'
+                                       ' group (or the whole match) is the group, ids which do not match form the'
+                                       ' empty group. Results are reported per group.', type=Regex())
+@click.option('-d', '--group-delimiter', help='Group each id by the part before the first occurrence of'
+                                              ' GROUP_DELIMITER. Cannot be used with --group-by.', type=Delimiter())
+@click.option('--max-groups', help='Maximum number of distinct groups held in memory while grouping. The command fails'
+                                   ' if more groups are found. Has no effect without --group-by or --group-delimiter.'
+                                   ' (Default: {})'.format(DEFAULT_MAX_GROUPS),
+              type=click.IntRange(min=1), default=DEFAULT_MAX_GROUPS)
+@click.argument('url', type=InputSource(), required=True)
 @click.argument('n', type=click.IntRange(min=1), required=True)
-def get(no_cache, refresh_cache, chunk_size, url, n):
+def get(no_cache, refresh_cache, chunk_size, largest, smallest, group_by, group_delimiter, max_groups, url, n):
     """
-    Prints the ids of the N largest numbers in the target remote file found at URL.
+    Prints the ids of the N largest numbers in the target file found at URL.
 
-    URL is the http(s) path containing a fully qualified domain name to the target file.
+    URL is the http(s) path containing a fully qualified domain name to the target file. It may instead be a file://
+    url or a path to a file on the local filesystem, or "-" to read from stdin. Local files and stdin are read
+    directly (gzip, bzip2 and xz content is decompressed as it is read) and are never cached, so the cache options
+    have no effect on them. Remote files are read from byte 500 onwards, local files and stdin from their first byte.
 
     N is the number of ids which will be printed to stdout
     (each id corresponding to the ith largest number in the file).
@@ -41,7 +60,17 @@ def get(no_cache, refresh_cache, chunk_size, url, n):
     Remote files are received in discrete chunks in order to preserve memory in the case of large files. Larger files
     should use the --chunk-size option to increase performance. Minimum chunk size is 1024 bytes with default value of
     256kb (256000 bytes).
+
+    With --largest, --smallest, --group-by or --group-delimiter every requested result is computed in a single pass
+    over the file and printed under a '==> [group "GROUP"] ORDERING N <==' header.
     """
+    if group_by is not None and group_delimiter is not None:
+        raise click.BadOptionUsage('group_delimiter', '--group-by and --group-delimiter cannot be used together.')
+    group_key = make_group_key(group_by, group_delimiter)
+    if not is_remote_url(url):
+        with open_local_source(url) as file:
+            print_extremes(file, n, largest, smallest, group_key, max_groups)
+        return
     remake_config_file_if_missing()
     config_file = CONFIG_FILE_PATH.open('rb')
     config = pickle.load(config_file)
@@ -51,8 +80,7 @@ def get(no_cache, refresh_cache, chunk_size, url, n):
     cache_root = Path(config[CACHE_PATH])
     file_name = get_remote_file(url, chunk_size, cache_root, refresh_cache)
     file = gzip.open((cache_root / file_name), 'rb')
-    n_largest = get_n_largest(file, n)  # generators ensure space complexity is no grater than O(parameter n)
-    print_n_largest(n_largest)
+    print_extremes(file, n, largest, smallest, group_key, max_groups)
     file.close()
     if no_cache:
         remove(cache_root / file_name)
@@ -1,5 +1,9 @@
 import click
 import re
+from constants import STDIN_SOURCE, FILE_URL_SCHEME, LOCAL_HOSTS
+from os import access, R_OK
+from pathlib import Path
+from urllib.parse import urlparse, unquote
 
 URL_REGEX = r'^http(s)?://([A-Za-z0-9\-._~:/?#\[\]@!$&\'()*+,;=]+)(\.)([A-Za-z0-9\-._~:/?#\[\]@!$&\'()*+,;=]+)$'
 ABS_PATH_REGEX = r'^/([A-Za-z0-9/_.]+)?$'
@@ -39,3 +43,58 @@ class RemoteUrl(click.ParamType):
                 ctx
             )
         return url
+
+
+class InputSource(click.ParamType):
+    name = 'input-source'
+
+    def convert(self, source, param, ctx):
+        """
+        Accepts a remote http(s) url, a file:// url, a local path or "-" for stdin. Remote urls and "-" are returned
+        unchanged, file:// urls and local paths are returned as the local path of a readable file, fifo or device.
+        """
+        if re.match(URL_REGEX, source) or source == STDIN_SOURCE:
+            return source
+        parsed = urlparse(source)
+        if parsed.scheme == FILE_URL_SCHEME and parsed.netloc not in LOCAL_HOSTS:
+            self.fail(
+                '{} refers to the remote host {}, only local file urls are supported'.format(source, parsed.netloc),
+                param,
+                ctx
+            )
+        path = Path(unquote(parsed.path)) if parsed.scheme == FILE_URL_SCHEME else Path(source).expanduser()
+        if not path.exists() or path.is_dir() or not access(path, R_OK):
+            self.fail(
+                '{} is not a valid url or existing local file'.format(source),
+                param,
+                ctx
+            )
+        return str(path)
+
+
+class Delimiter(click.ParamType):
+    name = 'delimiter'
+
+    def convert(self, delimiter, param, ctx):
+        if not delimiter:
+            self.fail(
+                'the group delimiter cannot be empty',
+                param,
+                ctx
+            )
+        return delimiter
+
+
+class Regex(click.ParamType):
+    name = 'regex'
+
+    def convert(self, pattern, param, ctx):
+        try:
+            re.compile(pattern)
+        except re.error as error:
+            self.fail(
+                '{} is not a valid regular expression ({})'.format(pattern, error),
+                param,
+                ctx
+            )
+        return pattern
@@ -1,5 +1,11 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
 import pickle
 import re
+import threading
 import unittest
 
 import click
@@ -7,9 +13,10 @@ import requests
 import shutil
 from click.testing import CliRunner
 from n_largest import get, clear_cache, set_cache_dir
-from constants import CACHE_PATH, CONFIG_FILE_PATH
-from param_types import LocalPath, RemoteUrl
-from util import NoContentError
+from constants import CACHE_PATH, CONFIG_FILE_PATH, LARGEST, SMALLEST
+from param_types import LocalPath, RemoteUrl, Regex, InputSource
+from util import NoContentError, TooManyGroupsError, get_grouped_n_extremes, get_n_largest, make_group_key, \
+    open_stream
 from pathlib import Path
 
 TEST_FILE_HASH = '04f62a08ad528d36cf6ff8c7e1dcf4b77f443fbf8f638a234e3aa1f4f1185284'
@@ -17,6 +24,7 @@ DEFAULT_VAR_DIR = Path('/usr/var')
 CACHE_DIR = Path('cache')
 CACHE_FULL_PATH = DEFAULT_VAR_DIR / CACHE_DIR
 NEW_CACHE = DEFAULT_VAR_DIR / Path('nlargest/cache')
+PROC_PAIR_FILE = '/proc/sys/net/ipv4/ip_local_port_range'
 
 
 class CustomAssertions:
@@ -113,6 +121,26 @@ class TestInvalidOptions(unittest.TestCase, CustomAssertions):
         self.assertContains(result.output, 'Error: Invalid value for \'-c\' / \'--chunk-size\': 1023 is smaller than'
                                            ' the minimum valid value 1024.\n')
 
+    def test_group_by_and_group_delimiter(self):
+        runner = CliRunner()
+        result = runner.invoke(get, ['--group-by', '^(a)', '--group-delimiter', '-', 'https://alexander-dubinski.com',
+                                     '50'])
+        self.assertEqual(result.exit_code, 2)
+        self.assertContains(result.output, '--group-by and --group-delimiter cannot be used together.')
+
+    def test_empty_group_delimiter(self):
+        runner = CliRunner()
+        result = runner.invoke(get, ['--group-delimiter', '', 'https://alexander-dubinski.com', '50'])
+        self.assertEqual(result.exit_code, 2)
+        self.assertContains(result.output, 'the group delimiter cannot be empty')
+
+    def test_smallest_lt_one(self):
+        runner = CliRunner()
+        result = runner.invoke(get, ['--smallest', '0', 'https://alexander-dubinski.com', '50'])
+        self.assertEqual(result.exit_code, 2)
+        self.assertContains(result.output, 'Error: Invalid value for \'-s\' / \'--smallest\': 0 is smaller than'
+                                           ' the minimum valid value 1.')
+
 
 class TestNLargestReporting(unittest.TestCase, CustomAssertions):
 
@@ -181,6 +209,159 @@ class TestNLargestReporting(unittest.TestCase, CustomAssertions):
                 CONFIG_FILE_PATH.unlink()
 
 
+class TestGroupedExtremes(unittest.TestCase):
+    lines = b'a-1 5\nb-1 9\na-2 7\nb-2 1\na-3 7\nc-1 3\n'
+
+    def test_single_group_matches_n_largest(self):
+        results = get_grouped_n_extremes(io.BytesIO(self.lines), [(LARGEST, 4)])
+        self.assertEqual(results[None][(LARGEST, 4)], get_n_largest(io.BytesIO(self.lines), 4))
+
+    def test_multiple_specs_in_one_pass(self):
+        results = get_grouped_n_extremes(io.BytesIO(self.lines), [(LARGEST, 1), (LARGEST, 3), (SMALLEST, 2)])
+        self.assertEqual(results[None][(LARGEST, 1)], [('b-1', 9)])
+        self.assertEqual(results[None][(LARGEST, 3)], [('b-1', 9), ('a-2', 7), ('a-3', 7)])
+        self.assertEqual(results[None][(SMALLEST, 2)], [('b-2', 1), ('c-1', 3)])
+
+    def test_group_by_delimiter(self):
+        results = get_grouped_n_extremes(io.BytesIO(self.lines), [(LARGEST, 2), (SMALLEST, 1)],
+                                         make_group_key(delimiter='-'))
+        self.assertEqual(list(results), ['a', 'b', 'c'])
+        self.assertEqual(results['a'][(LARGEST, 2)], [('a-2', 7), ('a-3', 7)])
+        self.assertEqual(results['a'][(SMALLEST, 1)], [('a-1', 5)])
+        self.assertEqual(results['c'][(LARGEST, 2)], [('c-1', 3)])
+
+    def test_group_by_regex(self):
+        group_key = make_group_key(pattern=r'^([ab])-')
+        self.assertEqual(group_key('a-1'), 'a')
+        self.assertEqual(group_key('c-1'), '')
+        self.assertEqual(make_group_key(pattern=r'\d$')('b-2'), '2')
+        self.assertEqual(make_group_key(pattern=r'^(a)?b')('b-1'), '')
+        self.assertIsNone(make_group_key())
+
+    def test_max_groups(self):
+        self.assertRaises(TooManyGroupsError, get_grouped_n_extremes, io.BytesIO(self.lines), [(LARGEST, 1)],
+                          make_group_key(delimiter='-'), 2)
+
+
+class ChunkedStream(io.RawIOBase):
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.chunks:
+            return 0
+        chunk = self.chunks.pop(0)
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+class TestLocalSources(unittest.TestCase, CustomAssertions):
+    lines = b'a-1 5\nb-1 9\na-2 7\nb-2 1\n'
+
+    def test_local_path(self):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            Path('local.txt').write_bytes(self.lines)
+            result = runner.invoke(get, ['local.txt', '2'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.output, 'b-1\na-2\n')
+            self.assertTrue(not CONFIG_FILE_PATH.exists())
+
+    def test_file_url(self):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            Path('local.txt').write_bytes(self.lines)
+            result = runner.invoke(get, [Path('local.txt').resolve().as_uri(), '1'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.output, 'b-1\n')
+
+    def test_compressed_local_paths(self):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            Path('local.gz').write_bytes(gzip.compress(self.lines))
+            Path('local.bz2').write_bytes(bz2.compress(self.lines))
+            Path('local.xz').write_bytes(lzma.compress(self.lines))
+            for file_name in ('local.gz', 'local.bz2', 'local.xz'):
+                result = runner.invoke(get, [file_name, '3'])
+                self.assertEqual(result.exit_code, 0)
+                self.assertEqual(result.output, 'b-1\na-2\na-1\n')
+
+    def test_stdin(self):
+        runner = CliRunner()
+        result = runner.invoke(get, ['--smallest', '1', '-', '1'], input=self.lines)
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.output, '==> largest 1 <==\nb-1\n==> smallest 1 <==\nb-2\n')
+
+    def test_compressed_stdin(self):
+        runner = CliRunner()
+        result = runner.invoke(get, ['--group-delimiter', '-', '-', '1'], input=gzip.compress(self.lines))
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.output, '==> group "a" largest 1 <==\na-2\n==> group "b" largest 1 <==\nb-1\n')
+
+    def test_empty_group_is_quoted(self):
+        runner = CliRunner()
+        result = runner.invoke(get, ['--group-by', '^(a)?-', '-', '1'], input=self.lines)
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.output, '==> group "a" largest 1 <==\na-2\n==> group "" largest 1 <==\nb-1\n')
+
+    def test_compressed_stream_in_small_chunks(self):
+        compressed = gzip.compress(self.lines)
+        chunks = [compressed[:1], compressed[1:3], compressed[3:4]] + [compressed[i:i + 5]
+                                                                     for i in range(4, len(compressed), 5)]
+        with open_stream(ChunkedStream(chunks), 'test') as file:
+            self.assertEqual(get_n_largest(file, 2), [('b-1', 9), ('a-2', 7)])
+
+    def test_fifo(self):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            os.mkfifo('pipe')
+
+            def write_pipe():
+                with open('pipe', 'wb') as pipe:
+                    compressed = gzip.compress(self.lines)
+                    pipe.write(compressed[:1])
+                    pipe.flush()
+                    pipe.write(compressed[1:])
+            writer = threading.Thread(target=write_pipe)
+            writer.start()
+            result = runner.invoke(get, ['pipe', '1'])
+            writer.join()
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.output, 'b-1\n')
+
+    @unittest.skipUnless(Path(PROC_PAIR_FILE).exists(), 'requires procfs')
+    def test_zero_size_regular_file_with_content(self):
+        runner = CliRunner()
+        low_port = Path(PROC_PAIR_FILE).read_text().split()[0]
+        result = runner.invoke(get, [PROC_PAIR_FILE, '1'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.output, '{}\n'.format(low_port))
+
+    def test_empty_stdin(self):
+        runner = CliRunner()
+        result = runner.invoke(get, ['-', '1'], input=b'')
+        self.assertEqual(result.exit_code, 1)
+        self.assertIsInstance(result.exception, NoContentError)
+
+    def test_empty_local_file(self):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            Path('empty.txt').touch()
+            result = runner.invoke(get, ['empty.txt', '5'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIsInstance(result.exception, NoContentError)
+
+    def tearDown(self):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            if CONFIG_FILE_PATH.exists():
+                CONFIG_FILE_PATH.unlink()
+
+
 class TestCacheBehavior(unittest.TestCase, CustomAssertions):
 
     def test_file_cached_in_cache_dir(self):
@@ -410,6 +591,22 @@ class TestCustomParamType(unittest.TestCase):
         self.assertRaises(click.exceptions.BadParameter, self.remote_url.convert, 'https://alex{}-dubinski.com',
                           None, None)
 
+    def test_input_source_missing_local_file(self):
+        self.assertRaises(click.exceptions.BadParameter, InputSource().convert, '/user/var/missing.txt', None, None)
+        self.assertRaises(click.exceptions.BadParameter, InputSource().convert, 'file:///user/var/missing.txt', None,
+                          None)
+
+    def test_input_source_directory(self):
+        self.assertRaises(click.exceptions.BadParameter, InputSource().convert, '/', None, None)
+
+    def test_input_source_remote_file_url(self):
+        self.assertRaises(click.exceptions.BadParameter, InputSource().convert, 'file://otherhost/dev/null', None,
+                          None)
+        self.assertEqual(InputSource().convert('file://localhost/dev/null', None, None), '/dev/null')
+
+    def test_regex_is_invalid(self):
+        self.assertRaises(click.exceptions.BadParameter, Regex().convert, '^(abc', None, None)
+
     def tearDown(self):
         runner = CliRunner()
         with runner.isolated_filesystem():
@@ -5,17 +5,56 @@ import requests
 import hashlib
 import heapq
 import gzip
+import bz2
+import lzma
+import io
+import mmap
+import stat
 from constants import SUCCESS_STATUS, FILE_START, RANGE_HEADER_TEMPLATE, RANGE_HEADER, CONFIG_FILE_PATH, \
-    DEFAULT_CACHE_PATH, CACHE_PATH
+    DEFAULT_CACHE_PATH, CACHE_PATH, LARGEST, SMALLEST, DEFAULT_MAX_GROUPS, STDIN_SOURCE, GZIP_MAGIC, BZIP2_MAGIC, \
+    XZ_MAGIC, MAGIC_LENGTH
+from contextlib import contextmanager
 from operator import itemgetter
+from param_types import URL_REGEX
 from pathlib import Path
 from os import fsync
 
+DECOMPRESSORS = (
+    (GZIP_MAGIC, lambda stream: gzip.GzipFile(fileobj=stream, mode='rb')),
+    (BZIP2_MAGIC, lambda stream: bz2.BZ2File(stream, mode='rb')),
+    (XZ_MAGIC, lambda stream: lzma.LZMAFile(stream, mode='rb')),
+)
+
 
 class NoContentError(Exception):
     pass
 
 
+class TooManyGroupsError(Exception):
+    pass
+
+
+class HeadPrefixedStream(io.RawIOBase):
+    """
+    Raw stream which returns the already consumed head bytes before continuing with the wrapped stream.
+    """
+
+    def __init__(self, head, stream):
+        self.head = head
+        self.stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.head:
+            size = min(len(buffer), len(self.head))
+            buffer[:size] = self.head[:size]
+            self.head = self.head[size:]
+            return size
+        return self.stream.readinto(buffer)
+
+
 def get_n_largest(file, n):
     """
     Most of the heavy lifting of the CLI is done here.
@@ -28,11 +67,99 @@ def get_n_largest(file, n):
     return heapq.nlargest(n,  id_number_tuple_generator(file), key=itemgetter(1))
 
 
+def get_grouped_n_extremes(file, specs, group_key=None, max_groups=DEFAULT_MAX_GROUPS):
+    """
+    Computes every requested top N (largest and/or smallest) for every group in a single pass over the file.
+    Each group keeps one bounded min heap per ordering, sized to the largest N requested for that ordering, so smaller
+    N of the same ordering are simply a prefix of the larger result. This takes at most O(mlog(n)) time for m lines.
+    :param file: any binary, line oriented file object, such as a cached file, a memory mapped local file or stdin.
+    :param specs: list of (ordering, n) tuples where ordering is either LARGEST or SMALLEST.
+    :param group_key: callable mapping an id to its group, or None to treat the whole file as a single group.
+    :param max_groups: the maximum number of distinct groups held in memory before TooManyGroupsError is raised.
+    :return: dict(group -> dict((ordering, n) -> list((id, number))))
+    """
+    largest_n = max((n for ordering, n in specs if ordering == LARGEST), default=0)
+    smallest_n = max((n for ordering, n in specs if ordering == SMALLEST), default=0)
+    groups = {}
+    for index, (num_id, number) in enumerate(id_number_tuple_generator(file)):
+        group = group_key(num_id) if group_key else None
+        heaps = groups.get(group)
+        if heaps is None:
+            if len(groups) >= max_groups:
+                raise TooManyGroupsError('More than {} distinct groups found. Use --max-groups to raise the limit or'
+                                         ' a coarser group key.'.format(max_groups))
+            heaps = groups[group] = ([], [])
+        largest_heap, smallest_heap = heaps
+        # the negated index makes the most recent entry lose ties, matching the stable ordering of heapq.nlargest
+        if largest_n:
+            push_bounded(largest_heap, (number, -index, num_id), largest_n)
+        if smallest_n:
+            push_bounded(smallest_heap, (-number, -index, num_id), smallest_n)
+    results = {}
+    for group, (largest_heap, smallest_heap) in groups.items():
+        ranked = {LARGEST: [(num_id, number) for number, _, num_id in sorted(largest_heap, reverse=True)],
+                  SMALLEST: [(num_id, -number) for number, _, num_id in sorted(smallest_heap, reverse=True)]}
+        results[group] = {(ordering, n): ranked[ordering][:n] for ordering, n in specs}
+    return results
+
+
+def push_bounded(heap, item, n):
+    if len(heap) < n:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+
+def make_group_key(pattern=None, delimiter=None):
+    """
+    Builds the function used to assign each id to a group.
+    With a pattern, the group is the first capture group of the first match in the id (or the whole match if the
+    pattern has no groups). Ids which do not match, or whose first capture group does not take part in the match, fall
+    into the empty group. With a delimiter, the group is the part of the id before the first occurrence of the
+    delimiter.
+    :return: callable(id) -> group, or None when no grouping was requested.
+    """
+    if pattern is not None:
+        regex = re.compile(pattern)
+
+        def regex_key(num_id):
+            match = regex.search(num_id)
+            if not match:
+                return ''
+            group = match.group(1) if regex.groups else match.group(0)
+            return group if group is not None else ''
+        return regex_key
+    if delimiter is not None:
+        return lambda num_id: num_id.split(delimiter, 1)[0]
+    return None
+
+
 def print_n_largest(n_largest):
     for num_id, number in n_largest:
         click.echo(num_id)
 
 
+def print_extremes(file, n, largest, smallest, group_key, max_groups):
+    if largest or smallest or group_key:
+        specs = list(dict.fromkeys([(LARGEST, n)] + [(LARGEST, size) for size in largest] +
+                                   [(SMALLEST, size) for size in smallest]))
+        results = get_grouped_n_extremes(file, specs, group_key, max_groups)
+        print_grouped_n_extremes(results, group_key is not None)
+    else:
+        n_largest = get_n_largest(file, n)  # generators ensure space complexity is no grater than O(parameter n)
+        print_n_largest(n_largest)
+
+
+def print_grouped_n_extremes(results, is_grouped):
+    for group, spec_results in results.items():
+        for (ordering, n), extremes in spec_results.items():
+            header = '{} {}'.format(ordering, n)
+            if is_grouped:
+                header = 'group "{}" {}'.format(group, header)
+            click.echo('==> {} <=='.format(header))
+            print_n_largest(extremes)
+
+
 def id_number_tuple_generator(file):
     for num_id, number in split_generator(file):
         yield num_id, int(number)
@@ -78,6 +205,69 @@ def get_remote_file(url, chunk_size, cache_root, should_refresh):
     return file_name
 
 
+def is_remote_url(source):
+    return bool(re.match(URL_REGEX, source))
+
+
+@contextmanager
+def open_local_source(source):
+    """
+    Opens a local file or stdin for reading without going through the cache.
+    Regular files are memory mapped while stdin, fifos and devices are read as a stream. Gzip, bzip2 and xz content is
+    detected from its magic bytes and decompressed as it is read, so no step holds more than a buffer of the input in
+    memory. Empty input raises NoContentError, as it does for remote files. Unlike remote files, which are fetched from
+    byte 500 onwards, local input is read from its first byte.
+    :param source: the path of a local file, or "-" for stdin.
+    :return: a binary file-like object which yields the decompressed lines of the source.
+    """
+    if source == STDIN_SOURCE:
+        with open_stream(click.get_binary_stream('stdin'), 'stdin') as file:
+            yield file
+        return
+    with Path(source).open('rb') as raw_file:
+        source_stat = Path(source).stat()
+        # mmap cannot map zero length files, and procfs/sysfs files report a size of 0 even when they have content
+        if not stat.S_ISREG(source_stat.st_mode) or not source_stat.st_size:
+            with open_stream(raw_file, source) as file:
+                yield file
+            return
+        with mmap.mmap(raw_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            file = decompress_stream(mapped_file, mapped_file[:MAGIC_LENGTH])
+            try:
+                yield file
+            finally:
+                if file is not mapped_file:
+                    file.close()
+
+
+@contextmanager
+def open_stream(stream, name):
+    """
+    Reads the first bytes of a non seekable stream to detect compression and puts them back in front of the rest of the
+    stream. The stream itself is left open.
+    """
+    head = stream.read(MAGIC_LENGTH)
+    if not head:
+        raise NoContentError('The input from {} is empty.'.format(name))
+    while len(head) < MAGIC_LENGTH:
+        chunk = stream.read(MAGIC_LENGTH - len(head))
+        if not chunk:
+            break
+        head += chunk
+    file = decompress_stream(io.BufferedReader(HeadPrefixedStream(head, stream)), head)
+    try:
+        yield file
+    finally:
+        file.close()
+
+
+def decompress_stream(stream, head):
+    for magic, decompressor in DECOMPRESSORS:
+        if head.startswith(magic):
+            return decompressor(stream)
+    return stream
+
+
 def make_range_header(current_chunk, chunk_size):
     return {RANGE_HEADER: RANGE_HEADER_TEMPLATE.format(current_chunk, current_chunk + chunk_size)}
 